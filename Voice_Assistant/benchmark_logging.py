@@ -0,0 +1,120 @@
+import os
+import time
+import queue
+import logging
+import logging.handlers
+import tempfile
+import numpy as np
+from src.audio_device_manager import StreamHealth
+from src.logging_setup import JsonFormatter, RateLimiter, StructuredQueueHandler, TEXT_FORMAT
+from src.voice_engine import VoiceEngine
+
+# Конфигурация
+CALLS = 20000
+FRAME_LENGTH = 512
+
+
+class FakeStatus:
+    """Имитация sd.CallbackFlags с установленным флагом переполнения"""
+    input_overflow = True
+
+    def __bool__(self):
+        return True
+
+    def __str__(self):
+        return "input overflow"
+
+
+def make_sync_logger(name, log_file, devnull):
+    """Старая схема: FileHandler и StreamHandler прямо в вызывающем потоке"""
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    for handler in (logging.FileHandler(log_file, encoding="utf-8"), logging.StreamHandler(devnull)):
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        logger.addHandler(handler)
+    return logger, None
+
+
+def make_queue_logger(name, log_file, devnull):
+    """Новая схема: QueueHandler в вызывающем потоке, вывод в QueueListener"""
+    log_queue = queue.Queue()
+    file_handler = logging.FileHandler(log_file, encoding="utf-8")
+    file_handler.setFormatter(JsonFormatter())
+    stream_handler = logging.StreamHandler(devnull)
+    stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    listener = logging.handlers.QueueListener(log_queue, file_handler, stream_handler)
+    listener.start()
+
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    logger.addHandler(StructuredQueueHandler(log_queue))
+    return logger, listener
+
+
+def close_logger(logger, listener):
+    """Остановка listener (дожидается разбора очереди) и закрытие обработчиков"""
+    if listener:
+        listener.stop()
+        handlers = listener.handlers
+    else:
+        handlers = logger.handlers
+    for handler in handlers:
+        handler.close()
+
+
+def make_engine(logger):
+    """VoiceEngine без потока и моделей: только то, что использует _audio_callback"""
+    engine = VoiceEngine.__new__(VoiceEngine)
+    engine.health = StreamHealth()
+    engine._status_limiter = RateLimiter(interval=5.0)
+    engine.logger = logger
+    engine._push_frame = lambda frame: None
+    return engine
+
+
+def baseline_callback(engine):
+    """Копия _audio_callback до изменений (логирование каждого статуса)"""
+    def callback(indata, frames, time, status):
+        if status:
+            engine.logger.warning(f"Аудио статус: {status}")
+        if indata.ndim > 1:
+            indata = indata[:, 0]
+        engine._push_frame(indata)
+    return callback
+
+
+def current_callback(engine):
+    return engine._audio_callback
+
+
+def measure(callback, status):
+    """Время одного вызова callback в микросекундах: (среднее, p99, максимум)"""
+    indata = np.zeros((FRAME_LENGTH, 1), dtype=np.int16)
+    timings = []
+    for _ in range(CALLS):
+        start = time.perf_counter()
+        callback(indata, FRAME_LENGTH, None, status)
+        timings.append((time.perf_counter() - start) * 1e6)
+    timings.sort()
+    return sum(timings) / len(timings), timings[int(len(timings) * 0.99)], timings[-1]
+
+
+def main():
+    schemes = [
+        ("FileHandler + StreamHandler (было)", make_sync_logger, baseline_callback),
+        ("QueueHandler", make_queue_logger, baseline_callback),
+        ("QueueHandler + RateLimiter (стало)", make_queue_logger, current_callback),
+    ]
+    print(f"Время _audio_callback на логирование статуса, мкс ({CALLS} вызовов)")
+    print(f"{'схема':<40}{'среднее':>10}{'p99':>10}{'макс':>10}")
+    with tempfile.TemporaryDirectory() as tmp_dir, open(os.devnull, "w") as devnull:
+        # Каждая схема со своим listener, который останавливается до следующего замера
+        for i, (name, make_logger, make_callback) in enumerate(schemes):
+            logger, listener = make_logger(f"bench.{i}", os.path.join(tmp_dir, f"{i}.log"), devnull)
+            mean, p99, worst = measure(make_callback(make_engine(logger)), FakeStatus())
+            close_logger(logger, listener)
+            print(f"{name:<40}{mean:>10.2f}{p99:>10.2f}{worst:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,20 +3,13 @@ import logging
 import argparse
 import threading
 import queue
-import sounddevice as sd
 from src.command_handler import CommandHandler
 from src.voice_engine import VoiceEngine
+from src.process_pipeline import ProcessVoiceEngine
+from src.audio_device_manager import AudioDeviceManager
 from src.config import PICOVOICE_TOKEN
+from src.logging_setup import setup_logging
 
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("assistant.log"),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger("JARVIS")
 
 class AssistantState:
@@ -29,6 +22,17 @@ class AssistantState:
         self.shutdown_requested = False
         self.mic_device_index = None
         self.voice_engine = None
+        self.multiprocess = False
+        self.device_manager = AudioDeviceManager()
+
+def create_voice_engine(state):
+    """Создание голосового движка: многопроцессного или в текущем процессе"""
+    engine_class = ProcessVoiceEngine if state.multiprocess else VoiceEngine
+    return engine_class(
+        picovoice_token=PICOVOICE_TOKEN,
+        mic_index=state.mic_device_index,
+        device_manager=state.device_manager
+    )
 
 def control_thread(state, command_handler):
     """Поток для управления через консоль"""
@@ -36,7 +40,7 @@ def control_thread(state, command_handler):
     print("  /mic [on|off] - управление микрофоном")
     print("  /text [on|off] - текстовый режим")
     print("  /hybrid [on|off] - гибридный режим")
-    print("  /devices - список аудиоустройств")
+    print("  /devices [refresh] - список аудиоустройств (refresh - поиск новых, прерывает запись)")
     print("  /set_mic [index] - выбрать микрофон")
     print("  /exit - завершение работы")
     print("\nUser commands (no prefix) will be processed normally")
@@ -90,30 +94,39 @@ def control_thread(state, command_handler):
                     else:
                         print("Usage: /hybrid [on|off]")
                         
-                elif cmd == "devices":
+                elif cmd in ("devices", "devices refresh"):
                     print("\nAvailable audio devices:")
-                    devices = sd.query_devices()
-                    for i, device in enumerate(devices):
-                        if device['max_input_channels'] > 0:
-                            print(f"[{i}] {device['name']} (in)")
+                    if cmd.endswith("refresh"):
+                        if state.voice_engine:
+                            state.voice_engine.rescan_devices()
+                        else:
+                            state.device_manager.rescan()
+                    devices = state.device_manager.input_devices()
+                    for i, device in devices:
+                        print(f"[{i}] {device['name']} (in)")
                 
                 elif cmd.startswith("set_mic "):
                     try:
                         new_index = int(cmd.split()[1])
-                        state.mic_device_index = new_index
-                        
+                    except (ValueError, IndexError):
+                        print("Usage: /set_mic [device_index]")
+                        continue
+                    
+                    try:
                         if state.voice_engine:
-                            state.voice_engine.cleanup()
-                        
-                        state.voice_engine = VoiceEngine(
-                            picovoice_token=PICOVOICE_TOKEN,
-                            mic_index=new_index
-                        )
-                        state.voice_engine.set_mic_state(state.mic_enabled)
+                            # Пересоздается только входной поток, модели остаются загруженными
+                            state.voice_engine.set_device(new_index)
+                            state.mic_device_index = new_index
+                        elif state.device_manager.device_name(new_index) is None:
+                            raise ValueError(f"Device {new_index} is not an input device, see /devices")
+                        else:
+                            state.mic_device_index = new_index
+                            state.voice_engine = create_voice_engine(state)
+                            state.voice_engine.set_mic_state(state.mic_enabled)
                         
                         logger.info(f"Microphone device set to index {new_index}")
-                    except (ValueError, IndexError):
-                        print("Usage: /set_mic [device_index]")
+                    except ValueError as e:
+                        print(str(e))
                 
                 else:
                     print(f"Unknown command: {cmd}. Type /help for available commands")
@@ -130,6 +143,8 @@ def control_thread(state, command_handler):
 
 def main():
     """Основная функция запуска помощника"""
+    # Настройка логирования: запись в файл и консоль вынесена в отдельный поток
+    log_listener = setup_logging("assistant.log")
     logger.info("Starting J.A.R.V.I.S. AI Assistant")
     
     # Парсинг аргументов командной строки
@@ -137,11 +152,14 @@ def main():
     parser.add_argument('--text-only', action='store_true', help='Text-only mode (microphone disabled)')
     parser.add_argument('--hybrid', action='store_true', help='Hybrid voice/text mode')
     parser.add_argument('--mic-index', type=int, default=None, help='Microphone device index')
+    parser.add_argument('--multiprocess', action='store_true',
+                        help='Run wake-word/ASR and TTS in separate worker processes')
     args = parser.parse_args()
     
     # Инициализация состояния
     state = AssistantState()
     state.mic_device_index = args.mic_index
+    state.multiprocess = args.multiprocess
     
     # Обработка аргументов командной строки
     if args.hybrid:
@@ -161,14 +179,11 @@ def main():
     
     # Создаем голосовой движок (если нужен микрофон)
     if state.mic_enabled:
-        state.voice_engine = VoiceEngine(
-            picovoice_token=PICOVOICE_TOKEN,
-            mic_index=state.mic_device_index
-        )
+        state.voice_engine = create_voice_engine(state)
         state.voice_engine.set_mic_state(True)
     
     logger.info(f"Initial mode: Mic={state.mic_enabled} (device={state.mic_device_index}), "
-                f"Text={state.text_mode}, Hybrid={state.hybrid_mode}")
+                f"Text={state.text_mode}, Hybrid={state.hybrid_mode}, Multiprocess={state.multiprocess}")
     
     # Запуск потока управления
     control_thr = threading.Thread(
@@ -197,7 +212,7 @@ def main():
                     
                     command = state.voice_engine.record_command()
                     if command:
-                        logger.info(f"Voice command: {command}")
+                        logger.info("Voice command: %s", command)
                         response = command_handler.handle(command, input_type="voice")
                         if response:
                             state.voice_engine.speak(response)
@@ -218,6 +233,7 @@ def main():
         # Затем устанавливаем флаг завершения
         state.shutdown_requested = True
         logger.info("Assistant shutdown complete")
+        log_listener.stop()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,109 @@
+import time
+import logging
+import threading
+from collections import deque
+import sounddevice as sd
+
+
+class StreamHealth:
+    """Статистика работоспособности входного аудиопотока"""
+    def __init__(self, window=5.0):
+        self.window = window
+        self.overflows = deque()
+        self.reset()
+
+    def reset(self):
+        """Сброс статистики (вызывается при открытии нового потока)"""
+        self.started_at = time.monotonic()
+        self.last_callback = None
+        self.callbacks = 0
+        self.overflows.clear()
+
+    def record_callback(self, status):
+        """Учет вызова callback. Вызывается из потока PortAudio, поэтому без блокировок"""
+        now = time.monotonic()
+        self.last_callback = now
+        self.callbacks += 1
+        if status and status.input_overflow:
+            self.overflows.append(now)
+
+    def overflow_rate(self):
+        """Количество переполнений в секунду за последнее окно"""
+        border = time.monotonic() - self.window
+        while self.overflows and self.overflows[0] < border:
+            self.overflows.popleft()
+        return len(self.overflows) / self.window
+
+    def callback_gap(self):
+        """Время с последнего вызова callback (или с открытия потока)"""
+        last = self.last_callback if self.last_callback is not None else self.started_at
+        return time.monotonic() - last
+
+
+class AudioDeviceManager:
+    """Кэширование списка аудиоустройств.
+
+    PortAudio строит список устройств один раз при инициализации, поэтому
+    подключенные позже устройства видны только после rescan().
+    """
+    def __init__(self, cache_ttl=5.0):
+        self.cache_ttl = cache_ttl
+
+        self._devices = None
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+
+        self.logger = logging.getLogger("AudioDeviceManager")
+
+    def query_devices(self, refresh=False):
+        """Список устройств из кэша; опрос PortAudio только по истечении TTL"""
+        with self._lock:
+            expired = time.monotonic() - self._fetched_at > self.cache_ttl
+            if refresh or self._devices is None or expired:
+                self._devices = [dict(device) for device in sd.query_devices()]
+                self._fetched_at = time.monotonic()
+            return self._devices
+
+    def input_devices(self, refresh=False):
+        """Список (индекс, устройство) для устройств с входными каналами"""
+        return [(i, device) for i, device in enumerate(self.query_devices(refresh))
+                if device['max_input_channels'] > 0]
+
+    def rescan(self):
+        """Повторная инициализация PortAudio для обнаружения подключенных/отключенных устройств.
+
+        Вызывать можно только когда ни один поток не открыт.
+        """
+        previous = self._signature(self._devices)
+        with self._lock:
+            try:
+                sd._terminate()
+                sd._initialize()
+            except Exception as e:
+                self.logger.error(f"Ошибка переинициализации PortAudio: {str(e)}")
+        devices = self.query_devices(refresh=True)
+        if previous and self._signature(devices) != previous:
+            self.logger.info(f"Список аудиоустройств изменился: {len(devices)} устройств")
+        return devices
+
+    def device_name(self, index):
+        """Имя входного устройства по индексу (None - устройство по умолчанию)"""
+        if index is None:
+            return None
+        devices = self.query_devices()
+        if 0 <= index < len(devices) and devices[index]['max_input_channels'] > 0:
+            return devices[index]['name']
+        return None
+
+    def resolve_device(self, name):
+        """Поиск индекса входного устройства по имени (индексы меняются после rescan)"""
+        if name is None:
+            return None
+        for i, device in self.input_devices():
+            if device['name'] == name:
+                return i
+        return None
+
+    @staticmethod
+    def _signature(devices):
+        return [(d['name'], d['max_input_channels']) for d in devices or []]
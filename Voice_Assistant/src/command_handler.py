@@ -53,18 +53,20 @@ class CommandHandler:
                     best_score = score
                     best_cmd = cmd
         
-        self.logger.debug(f"Распознано: '{text}' -> '{clean_text}' -> {best_cmd} ({best_score}%)")
+        self.logger.debug("Распознано: '%s' -> '%s' -> %s (%d%%)", text, clean_text, best_cmd, best_score)
         return best_cmd, best_score
 
     def handle(self, text, input_type="voice"):
-        self.logger.info(f"Обработка команды ({input_type}): '{text}'")
+        self.logger.info("Обработка команды (%s): '%s'", input_type, text,
+                         extra={"input_type": input_type, "text": text})
         
         command, score = self._recognize_command(text)
         
         if command and score >= self.threshold:
             try:
                 response = self.system_controller.execute(command, text)
-                self.logger.info(f"Выполнена команда: {command}")
+                self.logger.info("Выполнена команда: %s", command,
+                                 extra={"command": command, "score": score})
                 return response
             except Exception as e:
                 error_msg = f"Ошибка выполнения: {str(e)}"
@@ -75,5 +77,5 @@ class CommandHandler:
 
     def _handle_with_llm(self, text):
         # Заглушка
-        self.logger.info(f"Передача в LLM: '{text}'")
+        self.logger.info("Передача в LLM: '%s'", text)
         return "Я пока не умею отвечать на общие вопросы, но скоро научусь!"
@@ -0,0 +1,135 @@
+import copy
+import json
+import time
+import queue
+import threading
+import logging
+import logging.handlers
+
+# Стандартные атрибуты LogRecord; все остальные попадают в JSON как поля из extra=
+_RECORD_ATTRS = set(logging.LogRecord("", 0, "", 0, "", None, None).__dict__) | {"message", "asctime", "taskName"}
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class JsonFormatter(logging.Formatter):
+    """Форматирование записей лога в JSON (одна запись - одна строка)"""
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "process": record.processName,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler, сохраняющий traceback в exc_text, а не в тексте сообщения.
+
+    Стандартный prepare() склеивает сообщение с traceback, и JSON-запись
+    теряет отдельное поле исключения.
+    """
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            # exc_info не сериализуется для передачи между процессами
+            record.exc_info = None
+        return record
+
+
+class RateLimiter:
+    """Ограничение частоты повторяющихся сообщений по ключу"""
+    def __init__(self, interval=5.0):
+        self.interval = interval
+        self._last = {}
+        self._suppressed = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key):
+        """None, если сообщение нужно подавить; иначе число подавленных с прошлого вывода"""
+        now = time.monotonic()
+        with self._lock:
+            last = self._last.get(key)
+            if last is not None and now - last < self.interval:
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                return None
+            self._last[key] = now
+            return self._suppressed.pop(key, 0)
+
+    def flush(self):
+        """Подавленные повторы, интервал которых истек: [(ключ, число)]; считается выводом"""
+        now = time.monotonic()
+        pending = []
+        with self._lock:
+            for key, count in list(self._suppressed.items()):
+                if now - self._last[key] >= self.interval:
+                    del self._suppressed[key]
+                    self._last[key] = now
+                    pending.append((key, count))
+        return pending
+
+
+def setup_logging(log_file="assistant.log", level=logging.INFO):
+    """Неблокирующая настройка логирования.
+
+    Логгеры пишут только в очередь (QueueHandler), а файловый и консольный
+    вывод выполняет отдельный поток QueueListener. Возвращает запущенный
+    listener, который нужно остановить при завершении для сброса очереди.
+    """
+    log_queue = queue.Queue()
+
+    file_handler = logging.FileHandler(log_file, encoding="utf-8")
+    file_handler.setFormatter(JsonFormatter())
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    listener = logging.handlers.QueueListener(
+        log_queue, file_handler, stream_handler, respect_handler_level=True
+    )
+
+    _install_queue_handler(log_queue, level)
+    listener.start()
+    return listener
+
+
+class _RelayHandler(logging.Handler):
+    """Передача записей из дочерних процессов в логгеры основного процесса"""
+    def handle(self, record):
+        logging.getLogger(record.name).handle(record)
+        return True
+
+
+def start_log_relay(log_queue):
+    """Прием записей от дочерних процессов (multiprocessing.Queue) в основной пайплайн"""
+    relay = logging.handlers.QueueListener(log_queue, _RelayHandler())
+    relay.start()
+    return relay
+
+
+def setup_worker_logging(log_queue, level=logging.INFO):
+    """Логирование в дочернем процессе: записи отправляются в основной процесс"""
+    _install_queue_handler(log_queue, level)
+
+
+def _install_queue_handler(log_queue, level):
+    """Замена всех обработчиков корневого логгера на QueueHandler"""
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(StructuredQueueHandler(log_queue))
+    root.setLevel(level)
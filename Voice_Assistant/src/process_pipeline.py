@@ -0,0 +1,322 @@
+import time
+import json
+import logging
+import signal
+import multiprocessing
+import sounddevice as sd
+from src.voice_engine import VoiceEngine
+from src.speech_backends import (TTS_SAMPLE_RATE, create_porcupine, load_vosk_model,
+                                 create_recognizer, load_tts_model, synthesize)
+from src.shared_audio import SharedRingBuffer
+from src.logging_setup import setup_worker_logging, start_log_relay
+
+
+def _init_worker(log_queue):
+    """Общая инициализация дочернего процесса"""
+    # Ctrl+C приходит всей группе процессов; рабочие процессы останавливает движок
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    setup_worker_logging(log_queue)
+
+
+def recognition_worker(conn, log_queue, shm_name, ring_frames, frame_length, picovoice_token, sample_rate):
+    """Процесс распознавания: wake-word (Porcupine) и команды (Vosk)"""
+    _init_worker(log_queue)
+    logger = logging.getLogger("RecognitionWorker")
+    try:
+        ring = SharedRingBuffer(ring_frames, frame_length, name=shm_name)
+        porcupine = create_porcupine(picovoice_token)
+        vosk_model = load_vosk_model()
+    except Exception as e:
+        logger.error("Ошибка загрузки моделей: %s", e)
+        conn.send(("error", str(e)))
+        return
+    conn.send(("ready",))
+
+    cursor = ring.write_count
+    recognizer = None
+    samples_left = 0
+    try:
+        while True:
+            if conn.poll():
+                kind, *payload = conn.recv()
+                if kind == "stop":
+                    break
+                if kind == "record":
+                    # Запись начинается с текущего кадра, накопленное ранее не нужно
+                    cursor = ring.write_count
+                    recognizer = create_recognizer(vosk_model, sample_rate)
+                    samples_left = int(payload[0] * sample_rate)
+
+            frames, cursor = ring.read(cursor)
+            if not frames:
+                time.sleep(frame_length / sample_rate / 4)
+                continue
+
+            # Кадр, слот которого писатель успел перезаписать во время обработки, отбрасывается
+            for seq, frame in enumerate(frames, cursor - len(frames)):
+                if recognizer is None:
+                    detected = porcupine.process(frame) >= 0
+                    if detected and ring.intact(seq):
+                        conn.send(("wake",))
+                    continue
+                data = frame.tobytes()
+                try:
+                    if ring.intact(seq):
+                        recognizer.AcceptWaveform(data)
+                    # Отброшенный кадр все равно входит в длительность записи
+                    samples_left -= len(frame)
+                    if samples_left <= 0:
+                        text = json.loads(recognizer.FinalResult()).get("text", "").strip()
+                        recognizer = None
+                        conn.send(("text", text))
+                except Exception as e:
+                    logger.error("Ошибка распознавания: %s", e)
+                    recognizer = None
+                    conn.send(("text", ""))
+    except (EOFError, OSError):
+        # Основной процесс завершился
+        pass
+    finally:
+        # Представления кадров должны быть освобождены до закрытия разделяемой памяти
+        frames = frame = None
+        porcupine.delete()
+        ring.close()
+
+
+def synthesis_worker(conn, log_queue):
+    """Процесс синтеза и воспроизведения речи (Silero)"""
+    _init_worker(log_queue)
+    logger = logging.getLogger("SynthesisWorker")
+    try:
+        tts_model = load_tts_model()
+    except Exception as e:
+        logger.error("Ошибка загрузки TTS модели: %s", e)
+        conn.send(("error", str(e)))
+        return
+    conn.send(("ready",))
+
+    try:
+        while True:
+            kind, *payload = conn.recv()
+            if kind == "stop":
+                break
+            if kind == "speak":
+                text, output_device = payload
+                try:
+                    audio = synthesize(tts_model, text)
+                    sd.play(audio, samplerate=TTS_SAMPLE_RATE, device=output_device)
+                    sd.wait()
+                except Exception as e:
+                    logger.error("Ошибка синтеза речи: %s", e)
+                conn.send(("done",))
+    except (EOFError, OSError):
+        pass
+
+
+class WorkerProcess:
+    """Дочерний процесс с каналом управления и перезапуском после падения"""
+    def __init__(self, name, target, args, context):
+        self.name = name
+        self.target = target
+        self.args = args
+        self.context = context
+
+        self.process = None
+        self.conn = None
+        self.stopped = False
+        self.failures = 0
+        self.started_at = None
+        self.exited_at = None
+        self.restart_at = None
+
+        self.logger = logging.getLogger("WorkerProcess")
+
+    def start(self):
+        parent_conn, child_conn = self.context.Pipe()
+        self.process = self.context.Process(
+            target=self.target,
+            args=(child_conn, *self.args),
+            name=self.name,
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        if self.conn is not None:
+            self.conn.close()
+        self.conn = parent_conn
+        self.stopped = False
+        self.started_at = time.monotonic()
+        self.exited_at = None
+
+    def is_alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def send(self, *message):
+        self.conn.send(message)
+
+    def receive(self, expected, timeout):
+        """Ожидание сообщения нужного типа; None при таймауте, ошибке или падении процесса"""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                remaining = deadline - time.monotonic()
+                if not self.conn.poll(max(0.0, min(remaining, 0.1))):
+                    if remaining <= 0 or not self.is_alive():
+                        return None
+                    continue
+                kind, *payload = self.conn.recv()
+            except (EOFError, OSError):
+                return None
+            if kind == expected:
+                return payload
+            if kind == "error":
+                self.logger.error("Ошибка в процессе %s: %s", self.name, payload[0])
+                return None
+            # Устаревшие сообщения (например, "wake" во время записи) пропускаются
+
+    def supervise(self, backoff_base, backoff_max):
+        """Перезапуск упавшего процесса с экспоненциальной задержкой"""
+        if self.stopped or self.is_alive():
+            return
+        now = time.monotonic()
+        if self.exited_at is None:
+            self.exited_at = now
+            # Процесс, проработавший долго, считается восстановившимся
+            if now - self.started_at > backoff_max:
+                self.failures = 0
+            delay = min(backoff_base * 2 ** self.failures, backoff_max)
+            self.restart_at = now + delay
+            self.logger.warning("Процесс %s завершился (код %s), перезапуск через %.1f сек",
+                                self.name, self.process.exitcode, delay)
+        elif now >= self.restart_at:
+            self.failures += 1
+            self.start()
+            self.logger.info("Процесс %s перезапущен (попытка %d)", self.name, self.failures)
+
+    def stop(self, timeout=5.0):
+        self.stopped = True
+        if self.process is None:
+            return
+        try:
+            if self.is_alive():
+                self.send("stop")
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout)
+        self.conn.close()
+        self.process = None
+
+
+class ProcessVoiceEngine(VoiceEngine):
+    """Голосовой движок с распознаванием и синтезом речи в отдельных процессах.
+
+    Основной процесс только захватывает звук и пишет кадры в кольцевой
+    буфер в разделяемой памяти; процессы распознавания и синтеза читают
+    его без копирования и обмениваются с движком короткими сообщениями.
+    """
+    def __init__(self, picovoice_token, mic_index=None, sample_rate=16000, device_manager=None,
+                 ring_frames=256):
+        super().__init__(picovoice_token, mic_index=mic_index, sample_rate=sample_rate,
+                         device_manager=device_manager)
+        self.ring_frames = ring_frames  # 256 кадров по 512 сэмплов ~ 8 сек
+        self.startup_timeout = 120.0
+        self.reply_timeout = 60.0
+
+        self.ring = None
+        self.workers = {}
+        self._context = multiprocessing.get_context("spawn")
+        self._log_queue = None
+        self._log_relay = None
+        self._muted = False
+
+        self.logger = logging.getLogger("ProcessVoiceEngine")
+
+    def load_models(self):
+        """Запуск рабочих процессов вместо загрузки моделей в основном процессе"""
+        if self.workers:
+            return
+        if self.ring is None:
+            self.ring = SharedRingBuffer(self.ring_frames, self.frame_length, create=True)
+        if self._log_relay is None:
+            self._log_queue = self._context.Queue()
+            self._log_relay = start_log_relay(self._log_queue)
+
+        self.workers = {
+            "asr": WorkerProcess("RecognitionWorker", recognition_worker,
+                                 (self._log_queue, self.ring.name, self.ring_frames, self.frame_length,
+                                  self.picovoice_token, self.sample_rate),
+                                 self._context),
+            "tts": WorkerProcess("SynthesisWorker", synthesis_worker,
+                                 (self._log_queue,), self._context),
+        }
+        for worker in self.workers.values():
+            worker.start()
+        for worker in self.workers.values():
+            if worker.receive("ready", timeout=self.startup_timeout) is None:
+                raise RuntimeError(f"Ошибка инициализации голосового движка: процесс {worker.name} не запущен")
+        self.logger.info("Рабочие процессы запущены")
+
+    def unload_models(self):
+        """Остановка рабочих процессов и освобождение разделяемой памяти"""
+        workers, self.workers = self.workers, {}
+        for worker in workers.values():
+            worker.stop()
+        if self.ring:
+            self.ring.close()
+            self.ring.unlink()
+            self.ring = None
+        if self._log_relay:
+            self._log_relay.stop()
+            self._log_queue.close()
+            self._log_relay = None
+            self._log_queue = None
+        self.logger.debug("Рабочие процессы остановлены")
+
+    def _push_frame(self, frame):
+        """Запись кадра в кольцевой буфер (единственное копирование из буфера PortAudio)"""
+        if not self._muted and self.ring is not None:
+            self.ring.write(frame)
+
+    def _check_health(self):
+        for worker in list(self.workers.values()):
+            worker.supervise(self.backoff_base, self.backoff_max)
+        super()._check_health()
+
+    def check_activation(self):
+        """Проверка наличия wake-word (обнаруживается процессом распознавания)"""
+        if not self.is_active or "asr" not in self.workers:
+            return False
+        return self.workers["asr"].receive("wake", timeout=0) is not None
+
+    def record_command(self, duration=2):
+        """Запись и распознавание команды в процессе распознавания"""
+        if not self.is_active or "asr" not in self.workers:
+            self.logger.warning("Попытка записи при неактивном микрофоне")
+            return ""
+        self.logger.info("Начало записи команды (%s сек)", duration)
+        worker = self.workers["asr"]
+        try:
+            worker.send("record", duration)
+        except (OSError, ValueError) as e:
+            self.logger.error("Ошибка отправки команды записи: %s", e)
+            return ""
+        reply = worker.receive("text", timeout=duration + self.reply_timeout)
+        return reply[0] if reply else ""
+
+    def speak(self, text, output_device=None):
+        """Синтез речи в отдельном процессе; на время воспроизведения кадры не записываются"""
+        if not text or "tts" not in self.workers:
+            return
+        worker = self.workers["tts"]
+        self._muted = True
+        try:
+            worker.send("speak", text, output_device)
+            if worker.receive("done", timeout=self.reply_timeout) is None:
+                self.logger.error("Процесс синтеза речи не ответил")
+        except (OSError, ValueError) as e:
+            self.logger.error("Ошибка синтеза речи: %s", e)
+        finally:
+            self._muted = False
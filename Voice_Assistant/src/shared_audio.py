@@ -0,0 +1,91 @@
+import sys
+import numpy as np
+from multiprocessing import shared_memory
+
+
+def _attach(name):
+    """Подключение к существующему блоку разделяемой памяти без передачи владения"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: дочерние процессы spawn используют resource_tracker
+        # создателя, повторная регистрация того же имени ничего не меняет
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedRingBuffer:
+    """Кольцевой буфер аудиокадров int16 в разделяемой памяти.
+
+    Один писатель (callback микрофона) и любое число читателей в других
+    процессах. В начале блока хранится счетчик записанных кадров; каждый
+    читатель ведет свой курсор и получает кадры как представления numpy
+    поверх разделяемой памяти, без копирования.
+    """
+    HEADER_SIZE = 8  # int64: общее число записанных кадров
+
+    def __init__(self, frames, frame_length, name=None, create=False):
+        self.frames = frames
+        self.frame_length = frame_length
+
+        size = self.HEADER_SIZE + frames * frame_length * np.dtype(np.int16).itemsize
+        if create:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = _attach(name)
+
+        self._counter = np.ndarray((1,), dtype=np.int64, buffer=self.shm.buf)
+        self._slots = np.ndarray((frames, frame_length), dtype=np.int16,
+                                 buffer=self.shm.buf, offset=self.HEADER_SIZE)
+        if create:
+            self._counter[0] = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def write_count(self):
+        """Общее число записанных кадров"""
+        return int(self._counter[0])
+
+    def write(self, frame):
+        """Запись кадра в следующий слот (вызывается только писателем)"""
+        count = self._counter[0]
+        slot = self._slots[count % self.frames]
+        length = min(len(frame), self.frame_length)
+        slot[:length] = frame[:length]
+        slot[length:] = 0
+        # Счетчик увеличивается после записи данных, чтобы читатель не увидел неполный кадр
+        self._counter[0] = count + 1
+
+    def read(self, cursor):
+        """Кадры, записанные после cursor, и новое значение курсора.
+
+        Кадры - представления слотов, которые писатель продолжает заполнять,
+        поэтому после обработки кадра нужно проверить intact(). Если читатель
+        отстал больше чем на половину буфера, старые кадры пропускаются.
+        """
+        count = self.write_count
+        max_lag = self.frames // 2
+        if count - cursor > max_lag:
+            cursor = count - max_lag
+        return [self._slots[i % self.frames] for i in range(cursor, count)], count
+
+    def intact(self, seq):
+        """Кадр с номером seq еще не перезаписан (проверка после чтения, как в seqlock)"""
+        return self.write_count - seq < self.frames
+
+    def close(self):
+        """Отключение от разделяемой памяти; все представления кадров должны быть освобождены"""
+        if self._slots is not None:
+            # Представления кадров ссылаются на _slots. numpy не всегда удерживает
+            # экспорт буфера, и обращение к ним после закрытия роняет процесс
+            if sys.getrefcount(self._slots) > 2:
+                raise BufferError("Разделяемая память используется представлениями кадров")
+            self._counter = None
+            self._slots = None
+        self.shm.close()
+
+    def unlink(self):
+        """Удаление блока разделяемой памяти (вызывается создателем)"""
+        self.shm.unlink()
@@ -0,0 +1,53 @@
+import os
+
+# Библиотеки распознавания и синтеза импортируются внутри функций: каждый
+# процесс многопроцессного режима загружает только нужный ему бэкенд
+
+VOSK_MODEL_PATH = "models/vosk"
+TTS_SAMPLE_RATE = 48000
+
+
+def create_porcupine(access_key):
+    """Создание детектора wake-word"""
+    import pvporcupine
+    return pvporcupine.create(
+        access_key=access_key,
+        keywords=['jarvis'],
+        sensitivities=[0.7]
+    )
+
+
+def load_vosk_model(model_path=VOSK_MODEL_PATH):
+    """Загрузка модели распознавания речи Vosk"""
+    from vosk import Model
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Модель Vosk не найдена по пути: {model_path}")
+    return Model(model_path)
+
+
+def create_recognizer(vosk_model, sample_rate):
+    """Создание распознавателя Vosk для одной записи"""
+    from vosk import KaldiRecognizer
+    return KaldiRecognizer(vosk_model, sample_rate)
+
+
+def load_tts_model():
+    """Загрузка модели синтеза речи Silero"""
+    import torch
+    from silero import silero_tts
+    tts_result = silero_tts(language='ru',
+                            speaker='ru_v3',
+                            device=torch.device('cpu'))
+    # Сохраняем только модель
+    return tts_result[0]
+
+
+def synthesize(tts_model, text):
+    """Синтез речи с частотой TTS_SAMPLE_RATE"""
+    return tts_model.apply_tts(
+        text=text,
+        speaker='aidar',  # Идентификатор голоса
+        sample_rate=TTS_SAMPLE_RATE,
+        put_accent=True,
+        put_yo=True
+    )
@@ -23,7 +23,7 @@ class SystemController:
 
     def execute(self, command, raw_text=""):
         """Выполнение системной команды"""
-        self.logger.info(f"Выполнение команды: {command}")
+        self.logger.info("Выполнение команды: %s", command)
         
         try:
             if command == "open_browser":
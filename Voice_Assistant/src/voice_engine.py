@@ -1,26 +1,45 @@
-import os
 import time
 import queue
 import threading
 import numpy as np
 import sounddevice as sd
-import pvporcupine
-from vosk import Model, KaldiRecognizer
-import torch
 import json
 import logging
-from silero import silero_tts
+from src.audio_device_manager import AudioDeviceManager, StreamHealth
+from src.logging_setup import RateLimiter
+from src.speech_backends import (TTS_SAMPLE_RATE, create_porcupine, load_vosk_model,
+                                 create_recognizer, load_tts_model, synthesize)
 
 class VoiceEngine:
-    def __init__(self, picovoice_token, mic_index=None, sample_rate=16000):
+    def __init__(self, picovoice_token, mic_index=None, sample_rate=16000, device_manager=None):
         # Конфигурация
         self.picovoice_token = picovoice_token
         self.sample_rate = sample_rate
         self.mic_index = mic_index
         self.frame_length = 512
         
+        # Параметры самовосстановления потока
+        self.health_check_interval = 1.0
+        self.max_callback_gap = 2.0
+        self.max_overflow_rate = 1.0
+        self.backoff_base = 0.5
+        self.backoff_max = 30.0
+        self.fallback_probe_max = 600.0
+        
         # Состояние
         self.is_active = False
+        self.mic_name = None
+        self.health = StreamHealth()
+        self._status_limiter = RateLimiter(interval=5.0)
+        self._fallback_at = None
+        self._fallback_probes = 0
+        self._speaking = False
+        self._recovery_attempt = 0
+        self._recovery_at = 0.0
+        self._healthy_since = None
+        self._stream_lock = threading.RLock()
+        self._supervisor = None
+        self._supervisor_stop = threading.Event()
         
         # Ресурсы
         self.porcupine = None
@@ -28,40 +47,28 @@ class VoiceEngine:
         self.recorder = None
         self.audio_queue = queue.Queue()
         self.tts_model = None
+        self.device_manager = device_manager or AudioDeviceManager()
         
         # Логгер
         self.logger = logging.getLogger("VoiceEngine")
 
     def load_models(self):
         """Загрузка необходимых моделей"""
+        import pvporcupine
         try:
             # Инициализация Porcupine
             if not self.porcupine:
-                self.porcupine = pvporcupine.create(
-                    access_key=self.picovoice_token,
-                    keywords=['jarvis'],
-                    sensitivities=[0.7]
-                )
+                self.porcupine = create_porcupine(self.picovoice_token)
                 self.logger.info("Porcupine инициализирован")
             
             # Инициализация Vosk
             if not self.vosk_model:
-                # Проверка существования пути к модели
-                model_path = "models/vosk"
-                if not os.path.exists(model_path):
-                    self.logger.error(f"Путь к модели Vosk не существует: {model_path}")
-                    raise FileNotFoundError(f"Модель Vosk не найдена по пути: {model_path}")
-                
-                self.vosk_model = Model(model_path)
+                self.vosk_model = load_vosk_model()
                 self.logger.info("Vosk модель загружена")
             
             # Инициализация TTS
             if not self.tts_model:
-                tts_result = silero_tts(language='ru',
-                                        speaker='ru_v3',
-                                        device=torch.device('cpu'))
-            # Сохраняем только модель
-                self.tts_model = tts_result[0]
+                self.tts_model = load_tts_model()
                 self.logger.info("TTS модель загружена")
                 
         except pvporcupine.PorcupineInvalidArgumentError:
@@ -89,56 +96,236 @@ class VoiceEngine:
         elif not enabled and self.is_active:
             self._stop_listening()
 
-    def _start_listening(self):
+    def set_device(self, mic_index):
+        """Смена микрофона с пересозданием только входного потока"""
+        mic_name = self.device_manager.device_name(mic_index)
+        if mic_index is not None and mic_name is None:
+            raise ValueError(f"Устройство {mic_index} не найдено или не является микрофоном")
+        
+        with self._stream_lock:
+            previous = (self.mic_index, self.mic_name, self._fallback_at)
+            self.mic_index, self.mic_name, self._fallback_at = mic_index, mic_name, None
+            if not self.is_active:
+                return
+            self._close_stream()
+            try:
+                self._open_stream()
+            except Exception:
+                # Возврат к прежнему микрофону; если не выйдет, поток восстановит супервизор
+                self.mic_index, self.mic_name, self._fallback_at = previous
+                try:
+                    self._open_stream()
+                except Exception as e:
+                    self.logger.error(f"Ошибка возврата к прежнему микрофону: {str(e)}")
+                raise
+
+    def _start_listening(self, recover=False):
         """Запуск прослушивания микрофона"""
         try:
             self.load_models()
-            device_info = "default" if self.mic_index is None else f"device {self.mic_index}"
-            self.logger.info(f"Запуск микрофона ({device_info}), sample_rate={self.sample_rate}, frame_length={self.frame_length}")
-            self.recorder = sd.InputStream(
-                device=self.mic_index,
-                samplerate=self.sample_rate,
-                channels=1,
-                dtype='int16',
-                blocksize=self.frame_length,
-                callback=self._audio_callback
-            )
-            self.recorder.start()
-            self.is_active = True
-            self.logger.info("Микрофон активирован")
-        except Exception as e:
-            self.logger.error(f"Ошибка запуска микрофона: {str(e)}")
+        except Exception:
             self.unload_models()
             raise
+        
+        with self._stream_lock:
+            try:
+                self._open_stream()
+            except Exception as e:
+                self.logger.error(f"Ошибка запуска микрофона: {str(e)}")
+                if not recover:
+                    raise
+                # Поток будет восстановлен супервизором
+            self.is_active = True
+        self._ensure_supervisor()
+        self.logger.info("Микрофон активирован")
 
     def _stop_listening(self):
         """Остановка прослушивания микрофона"""
         if not self.is_active:
             return
             
+        with self._stream_lock:
+            try:
+                self._close_stream()
+            except Exception as e:
+                self.logger.error(f"Ошибка остановки микрофона: {str(e)}")
+                raise
+            finally:
+                self.is_active = False
+        self.logger.info("Микрофон деактивирован")
+
+    def _open_stream(self):
+        """Создание и запуск sd.InputStream (модели и очередь не затрагиваются)"""
+        if self.mic_name is None and self.mic_index is not None:
+            self.mic_name = self.device_manager.device_name(self.mic_index)
+        device_info = "default" if self.mic_index is None else f"device {self.mic_index}"
+        self.logger.info(f"Запуск микрофона ({device_info}), sample_rate={self.sample_rate}, frame_length={self.frame_length}")
+        recorder = sd.InputStream(
+            device=self.mic_index,
+            samplerate=self.sample_rate,
+            channels=1,
+            dtype='int16',
+            blocksize=self.frame_length,
+            callback=self._audio_callback
+        )
+        self.health.reset()
         try:
-            if self.recorder:
-                self.recorder.stop()
-                self.recorder.close()
-                self.recorder = None
-                
-            self.is_active = False
-            self.logger.info("Микрофон деактивирован")
-        except Exception as e:
-            self.logger.error(f"Ошибка остановки микрофона: {str(e)}")
+            recorder.start()
+        except Exception:
+            recorder.close()
             raise
+        self.recorder = recorder
+
+    def _close_stream(self):
+        """Остановка и закрытие sd.InputStream"""
+        recorder, self.recorder = self.recorder, None
+        if recorder:
+            try:
+                recorder.stop()
+            finally:
+                recorder.close()
+
+    def _stream_problem(self):
+        """(причина, нужен ли rescan PortAudio), если поток нужно пересоздать, иначе None"""
+        if self.recorder is None or not self.recorder.active:
+            return "поток остановлен", True
+        gap = self.health.callback_gap()
+        if gap > self.max_callback_gap:
+            return f"нет аудиоданных {gap:.1f} сек", False
+        rate = self.health.overflow_rate()
+        if rate > self.max_overflow_rate:
+            return f"переполнения входного буфера: {rate:.1f}/сек", False
+        if self._fallback_at and time.monotonic() - self._fallback_at > self._fallback_probe_delay():
+            return f"повторный поиск устройства '{self.mic_name}'", True
+        return None
+
+    def _ensure_supervisor(self):
+        """Запуск потока контроля состояния аудиопотока"""
+        if self._supervisor and self._supervisor.is_alive():
+            return
+        self._supervisor_stop.clear()
+        self._supervisor = threading.Thread(
+            target=self._supervise,
+            name="AudioStreamSupervisor",
+            daemon=True
+        )
+        self._supervisor.start()
+
+    def _supervise(self):
+        while not self._supervisor_stop.wait(self.health_check_interval):
+            self._check_health()
+
+    def _check_health(self):
+        """Одна проверка состояния аудиопотока; не больше одной попытки восстановления за вызов"""
+        # Итог серии повторов, которая закончилась, не дождавшись следующего вывода
+        for flags, suppressed in self._status_limiter.flush():
+            self.logger.warning("Аудио статус: %s (подавлено повторов: %d)", flags, suppressed,
+                                extra={"audio_status": flags, "suppressed": suppressed})
+        with self._stream_lock:
+            problem = self._stream_problem() if self.is_active else None
+        now = time.monotonic()
+        if not problem:
+            # Счетчик попыток сбрасывается только после устойчивой работы потока
+            if self._healthy_since is None:
+                self._healthy_since = now
+            elif now - self._healthy_since >= self.backoff_max:
+                self._recovery_attempt = 0
+            return
+        self._healthy_since = None
+        if now < self._recovery_at:
+            return
+        reason, rescan = problem
+        if self._recovery_attempt == 0:
+            self.logger.warning(f"Аудиопоток неисправен ({reason}), пересоздание")
+        self._recover_stream(rescan)
+
+    def _recover_stream(self, rescan=True):
+        """Попытка пересоздания входного потока; следующая - не раньше чем через экспоненциальную задержку"""
+        with self._stream_lock:
+            if not self.is_active:
+                return
+            try:
+                self._close_stream()
+            except Exception as e:
+                self.logger.debug(f"Ошибка закрытия неисправного потока: {str(e)}")
+            if rescan:
+                # Потоков нет - можно безопасно переинициализировать PortAudio
+                self.device_manager.rescan()
+                self._resolve_mic_index()
+            try:
+                self._open_stream()
+                self.logger.info(f"Аудиопоток пересоздан (попытка {self._recovery_attempt + 1})")
+            except Exception as e:
+                self.logger.error(f"Ошибка восстановления аудиопотока: {str(e)}")
+        
+        delay = min(self.backoff_base * 2 ** self._recovery_attempt, self.backoff_max)
+        self._recovery_attempt += 1
+        self._recovery_at = time.monotonic() + delay
+
+    def _resolve_mic_index(self):
+        """Поиск выбранного микрофона по имени; при его отсутствии - устройство по умолчанию"""
+        if self.mic_name is None:
+            return
+        index = self.device_manager.resolve_device(self.mic_name)
+        if index is None:
+            if self._fallback_at is None:
+                self.logger.warning(f"Микрофон '{self.mic_name}' недоступен, используется устройство по умолчанию")
+                self._fallback_probes = 0
+            else:
+                self._fallback_probes += 1
+            self._fallback_at = time.monotonic()
+        elif self._fallback_at is not None:
+            self.logger.info(f"Микрофон '{self.mic_name}' снова доступен")
+            self._fallback_at = None
+        self.mic_index = index
+
+    def _fallback_probe_delay(self):
+        """Интервал повторного поиска выбранного микрофона, растет с каждой неудачной проверкой"""
+        return min(self.backoff_max * 2 ** self._fallback_probes, self.fallback_probe_max)
+
+    def rescan_devices(self):
+        """Поиск подключенных/отключенных устройств с кратковременным перезапуском потока"""
+        with self._stream_lock:
+            if self._speaking:
+                # Переинициализация PortAudio прервет воспроизведение
+                return self.device_manager.query_devices()
+            if not self.is_active:
+                return self.device_manager.rescan()
+            try:
+                self._close_stream()
+            except Exception as e:
+                self.logger.debug(f"Ошибка закрытия потока: {str(e)}")
+            devices = self.device_manager.rescan()
+            self._resolve_mic_index()
+            try:
+                self._open_stream()
+            except Exception as e:
+                # Поток будет восстановлен супервизором
+                self.logger.error(f"Ошибка запуска микрофона: {str(e)}")
+            return devices
 
     def _audio_callback(self, indata, frames, time, status):
         """Callback для обработки аудиопотока"""
+        self.health.record_callback(status)
         if status:
-            self.logger.warning(f"Аудио статус: {status}")
+            # Повторяющиеся флаги выводятся не чаще раза в интервал; сам вывод
+            # выполняет поток QueueListener, здесь только постановка в очередь
+            flags = str(status)
+            suppressed = self._status_limiter.hit(flags)
+            if suppressed is not None:
+                self.logger.warning("Аудио статус: %s (подавлено повторов: %d)", flags, suppressed,
+                                    extra={"audio_status": flags, "suppressed": suppressed})
         
         # Конвертация в моно при необходимости (НЕ ИСПОЛЬЗУЕТСЯ)
         if indata.ndim > 1:
             indata = indata[:, 0]
             # indata = np.mean(indata, axis=1)
             
-        self.audio_queue.put(indata.copy())
+        self._push_frame(indata)
+
+    def _push_frame(self, frame):
+        """Передача кадра потребителям (буфер PortAudio нужно скопировать)"""
+        self.audio_queue.put(frame.copy())
 
     def check_activation(self):
         """Проверка наличия wake-word"""
@@ -152,7 +339,7 @@ class VoiceEngine:
         except queue.Empty:
             return False
         except Exception as e:
-            self.logger.error(f"Ошибка проверки активации: {str(e)}")
+            self.logger.error("Ошибка проверки активации: %s", e)
             return False
 
     def record_command(self, duration=2):
@@ -160,7 +347,7 @@ class VoiceEngine:
         if not self.is_active:
             self.logger.warning("Попытка записи при неактивном микрофоне")
             return ""
-        self.logger.info(f"Начало записи команды ({duration} сек)")    
+        self.logger.info("Начало записи команды (%s сек)", duration)    
         audio_frames = []
         start_time = time.time()
         
@@ -174,14 +361,15 @@ class VoiceEngine:
         if not audio_frames:
             return ""
         
-        total_samples = sum(frame.shape[0] for frame in audio_frames)
-        self.logger.debug(f"Запись завершена: {len(audio_frames)} фреймов, {total_samples} сэмплов")    
+        if self.logger.isEnabledFor(logging.DEBUG):
+            total_samples = sum(frame.shape[0] for frame in audio_frames)
+            self.logger.debug("Запись завершена: %d фреймов, %d сэмплов", len(audio_frames), total_samples)    
         # Объединение фреймов
         audio_data = np.concatenate(audio_frames)
         
         # Распознавание команды
         try:
-            recognizer = KaldiRecognizer(self.vosk_model, self.sample_rate)
+            recognizer = create_recognizer(self.vosk_model, self.sample_rate)
             recognizer.AcceptWaveform(audio_data.tobytes())
             result = json.loads(recognizer.Result())
             return result.get("text", "").strip()
@@ -195,31 +383,31 @@ class VoiceEngine:
             return
             
         was_active = self.is_active
+        self._speaking = True
         try:
             # Временное отключение микрофона
             if was_active:
                 self._stop_listening()
             
             # Генерация и воспроизведение речи
-            audio = self.tts_model.apply_tts(
-                text=text,
-                speaker='aidar',  # Идентификатор голоса
-                sample_rate=48000,
-                put_accent=True,
-                put_yo=True
-            )
+            audio = synthesize(self.tts_model, text)
             
-            sd.play(audio, samplerate=48000, device=output_device)
+            sd.play(audio, samplerate=TTS_SAMPLE_RATE, device=output_device)
             sd.wait()
         except Exception as e:
             self.logger.error(f"Ошибка синтеза речи: {str(e)}")
         finally:
+            self._speaking = False
             # Восстановление состояния микрофона
             if was_active:
-                self._start_listening()
+                self._start_listening(recover=True)
 
     def cleanup(self):
         """Полное освобождение ресурсов"""
+        self._supervisor_stop.set()
+        if self._supervisor:
+            self._supervisor.join(timeout=self.health_check_interval + 1)
+            self._supervisor = None
         self._stop_listening()
         self.unload_models()
         self.logger.info("Ресурсы голосового движка освобождены")
@@ -0,0 +1,77 @@
+import pytest
+from src import audio_device_manager
+from src.audio_device_manager import AudioDeviceManager, StreamHealth
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class Status:
+    def __init__(self, input_overflow):
+        self.input_overflow = input_overflow
+
+    def __bool__(self):
+        return self.input_overflow
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(audio_device_manager.time, "monotonic", clock)
+    return clock
+
+
+def device(name, inputs=1, outputs=0):
+    return {"name": name, "max_input_channels": inputs, "max_output_channels": outputs}
+
+
+def test_overflow_rate_counts_only_window(clock):
+    health = StreamHealth(window=5.0)
+    for _ in range(10):
+        health.record_callback(Status(True))
+        health.record_callback(Status(False))
+    assert health.overflow_rate() == 2.0
+
+    clock.now += 3.0
+    health.record_callback(Status(True))
+    clock.now += 2.5
+    # Первые 10 переполнений вышли из окна
+    assert health.overflow_rate() == 0.2
+
+
+def test_callback_gap(clock):
+    health = StreamHealth()
+    clock.now += 1.5
+    # До первого вызова отсчет идет от открытия потока
+    assert health.callback_gap() == 1.5
+
+    health.record_callback(None)
+    clock.now += 0.5
+    assert health.callback_gap() == 0.5
+
+    health.reset()
+    assert health.callback_gap() == 0.0
+
+
+def test_resolve_device_after_indices_change(monkeypatch):
+    devices = [device("Speakers", 0, 2), device("USB Mic"), device("Built-in Mic")]
+    monkeypatch.setattr(audio_device_manager.sd, "query_devices", lambda: devices)
+    monkeypatch.setattr(audio_device_manager.sd, "_terminate", lambda: None, raising=False)
+    monkeypatch.setattr(audio_device_manager.sd, "_initialize", lambda: None, raising=False)
+    manager = AudioDeviceManager()
+
+    assert manager.device_name(1) == "USB Mic"
+    assert manager.device_name(0) is None
+    assert manager.resolve_device("USB Mic") == 1
+
+    # После подключения нового устройства индексы сдвигаются
+    devices[:] = [device("HDMI", 0, 2), device("Speakers", 0, 2), device("Built-in Mic"), device("USB Mic")]
+    assert manager.resolve_device("USB Mic") == 1  # список еще из кэша
+    manager.rescan()
+    assert manager.resolve_device("USB Mic") == 3
+    assert manager.resolve_device("Speakers") is None
@@ -0,0 +1,55 @@
+import json
+import queue
+import logging
+import pickle
+import sys
+from src.logging_setup import JsonFormatter, RateLimiter, StructuredQueueHandler
+
+
+def make_record(exc_info=None):
+    return logging.LogRecord("test", logging.ERROR, __file__, 1, "boom %d", (1,), exc_info)
+
+
+def test_queue_handler_keeps_exception_separate():
+    handler = StructuredQueueHandler(queue.Queue())
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        record = handler.prepare(make_record(sys.exc_info()))
+
+    # Запись должна передаваться между процессами
+    record = pickle.loads(pickle.dumps(record))
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["msg"] == "boom 1"
+    assert "ZeroDivisionError" in entry["exc"]
+
+
+def test_rate_limiter_counts_suppressed():
+    limiter = RateLimiter(interval=60.0)
+
+    assert limiter.hit("overflow") == 0
+    assert limiter.hit("overflow") is None
+    assert limiter.hit("overflow") is None
+    assert limiter.hit("underflow") == 0
+
+    limiter._last["overflow"] -= 60.0
+    assert limiter.hit("overflow") == 2
+
+
+def test_rate_limiter_flushes_finished_burst():
+    limiter = RateLimiter(interval=60.0)
+    limiter.hit("overflow")
+    limiter.hit("overflow")
+    limiter.hit("overflow")
+
+    # Интервал еще не истек
+    assert limiter.flush() == []
+
+    limiter._last["overflow"] -= 60.0
+    assert limiter.flush() == [("overflow", 2)]
+    assert limiter.flush() == []
+
+    # Следующий повтор не получает уже выведенный счетчик
+    limiter._last["overflow"] -= 60.0
+    assert limiter.hit("overflow") == 0
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from src.shared_audio import SharedRingBuffer
+
+
+@pytest.fixture
+def ring():
+    ring = SharedRingBuffer(4, 8, create=True)
+    yield ring
+    ring.close()
+    ring.unlink()
+
+
+def frame(value, length=8):
+    return np.full(length, value, dtype=np.int16)
+
+
+def test_write_and_read(ring):
+    ring.write(frame(1))
+    ring.write(frame(2))
+
+    frames, cursor = ring.read(0)
+
+    assert cursor == 2
+    assert [int(f[0]) for f in frames] == [1, 2]
+    assert ring.read(cursor)[0] == []
+
+
+def test_short_frame_is_zero_padded(ring):
+    ring.write(frame(3))
+    ring.write(frame(5, length=3))
+
+    frames, _ = ring.read(1)
+
+    assert frames[0].tolist() == [5, 5, 5, 0, 0, 0, 0, 0]
+
+
+def test_overrun_skips_oldest_frames(ring):
+    for value in range(10):
+        ring.write(frame(value))
+
+    frames, cursor = ring.read(0)
+
+    # Отставший читатель перескакивает вперед на половину буфера
+    assert cursor == 10
+    assert [int(f[0]) for f in frames] == [8, 9]
+
+
+def test_intact_detects_overwritten_slot(ring):
+    ring.write(frame(1))
+    frames, cursor = ring.read(0)
+    assert ring.intact(0)
+
+    # Писатель обошел буфер по кругу: слот кадра 0 занят кадром 4
+    for value in range(2, 6):
+        ring.write(frame(value))
+
+    assert not ring.intact(0)
+    assert int(frames[0][0]) == 5
+    assert ring.intact(4)
+
+
+def test_reader_sees_frames_without_copy(ring):
+    reader = SharedRingBuffer(4, 8, name=ring.name)
+    try:
+        ring.write(frame(42))
+        frames, _ = reader.read(0)
+        assert int(frames[0][0]) == 42
+        assert not frames[0].flags.owndata
+    finally:
+        frames = None
+        reader.close()
+
+
+def test_close_requires_released_views():
+    ring = SharedRingBuffer(4, 8, create=True)
+    ring.write(frame(1))
+    frames, _ = ring.read(0)
+    view = frames[0]
+    frames = None
+
+    with pytest.raises(BufferError):
+        ring.close()
+
+    view = None
+    ring.close()
+    ring.unlink()
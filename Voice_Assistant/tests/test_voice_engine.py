@@ -0,0 +1,114 @@
+import pytest
+from src import voice_engine
+from src.voice_engine import VoiceEngine
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeDeviceManager:
+    def __init__(self, devices):
+        self.devices = devices
+        self.rescans = 0
+
+    def rescan(self):
+        self.rescans += 1
+        return self.devices
+
+    def device_name(self, index):
+        if index is None or not 0 <= index < len(self.devices):
+            return None
+        name, inputs = self.devices[index]
+        return name if inputs > 0 else None
+
+    def resolve_device(self, name):
+        for i, (device_name, inputs) in enumerate(self.devices):
+            if device_name == name and inputs > 0:
+                return i
+        return None
+
+
+class FakeRecorder:
+    active = True
+    closed = False
+
+    def stop(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(voice_engine.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def manager():
+    return FakeDeviceManager([("Speakers", 0), ("USB Mic", 1), ("Built-in Mic", 1)])
+
+
+@pytest.fixture
+def engine(manager):
+    engine = VoiceEngine("token", device_manager=manager)
+    engine.is_active = True
+    return engine
+
+
+def test_fallback_to_default_device(engine, manager, clock):
+    engine.mic_index, engine.mic_name = 1, "USB Mic"
+    manager.devices = [("Speakers", 0), ("Built-in Mic", 1)]
+
+    engine._resolve_mic_index()
+    assert engine.mic_index is None
+    assert engine._fallback_at == clock.now
+
+    # Устройство вернулось под другим индексом
+    manager.devices = [("Speakers", 0), ("Built-in Mic", 1), ("USB Mic", 1)]
+    engine._resolve_mic_index()
+    assert engine.mic_index == 2
+    assert engine._fallback_at is None
+
+
+def test_fallback_probe_delay_grows(engine, manager, clock):
+    engine.mic_name = "USB Mic"
+    manager.devices = [("Built-in Mic", 1)]
+
+    delays = []
+    for _ in range(7):
+        engine._resolve_mic_index()
+        delays.append(engine._fallback_probe_delay())
+    assert delays == [30.0, 60.0, 120.0, 240.0, 480.0, 600.0, 600.0]
+
+
+def test_recover_stream_backoff_grows(engine, manager, clock, monkeypatch):
+    def fail():
+        raise RuntimeError("device unavailable")
+    monkeypatch.setattr(engine, "_open_stream", fail)
+
+    delays = []
+    for _ in range(8):
+        engine._recover_stream(rescan=False)
+        delays.append(engine._recovery_at - clock.now)
+    assert delays == [0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 30.0, 30.0]
+    assert manager.rescans == 0
+
+
+def test_set_device_rejects_output_only_device(engine):
+    recorder = FakeRecorder()
+    engine.recorder, engine.mic_index, engine.mic_name = recorder, 1, "USB Mic"
+
+    with pytest.raises(ValueError):
+        engine.set_device(0)
+
+    assert engine.recorder is recorder
+    assert not recorder.closed
+    assert (engine.mic_index, engine.mic_name) == (1, "USB Mic")